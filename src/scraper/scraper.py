@@ -1,8 +1,18 @@
 import requests
-from bs4 import BeautifulSoup
+from requests_cache import CachedSession
+import lxml.html
+import ahocorasick
+import orjson
+import numpy as np
 import pandas as pd
+import re
+import sys
 import time
 import logging
+import threading
+from collections import Counter
+from html import unescape
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
 
@@ -26,6 +36,44 @@ WIKI_CH11_URL = (
     "Companies_that_filed_for_Chapter_11_bankruptcy_in_{year}"
 )
 
+# category members are plain <a href="/wiki/..." title="...">NAME</a> links,
+# the block starts at <div id="mw-pages"> and ends before whichever of these comes first
+# the header above the member lists links to Help:Category ("recent changes"), never a company
+NON_MEMBER_NAMESPACES = ("Help:", "Category:")
+CATEGORY_LINK_RE = re.compile(
+    rb'<a href="/wiki/(?!' + b"|".join(ns.encode() for ns in NON_MEMBER_NAMESPACES) + rb')[^"]+"[^>]*>([^<]+)</a>'
+)
+CATEGORY_LINK_XPATH = './/a[starts-with(@href, "/wiki/")' + "".join(
+    f' and not(starts-with(@href, "/wiki/{ns}"))' for ns in NON_MEMBER_NAMESPACES
+) + "]/text()"
+MW_PAGES_START = b'id="mw-pages"'
+MW_PAGES_ENDS = (b'id="mw-category-media"', b'class="printfooter"', b'id="catlinks"')
+
+# on-disk http cache so reruns skip the network
+HTTP_CACHE_NAME = "http_cache.sqlite"
+HTTP_CACHE_TTL = 24 * 60 * 60 #seconds
+
+# column order and dtypes of the SEC company records (tier is added afterwards)
+COMPANY_DTYPES = {
+    "cik":             "str",
+    "name":            "str",
+    "sic":             np.int32,
+    "sic_description": "str",
+    "state":           "str",
+    "n_10k":           np.int32,
+    "n_8k":            np.int32,
+    "n_total_filings": np.int32,
+    "ticker":          "str",
+}
+
+# keep concurrent wikipedia fetches polite
+WIKI_MAX_WORKERS = 4
+WIKI_MAX_RPS = 4
+
+# SEC fair-access policy caps us at 10 requests/sec
+SEC_MAX_WORKERS = 8
+SEC_MAX_RPS = 10
+
 """
 A bit of background:
 SIC code ranges can be used for supply chain tier mappign
@@ -49,21 +97,118 @@ SIC_RANGES = [
     (range(5900, 6000), 4),
 ]
 
+# SIC codes are 4 digits, so precompute the tier of every code once
+# ranges overlap and the first match wins, hence filling in reverse
+SIC_TIER_LUT = np.full(10000, 2, dtype=np.int8) #default to middle if unknown
+for _sic_range, _tier in reversed(SIC_RANGES):
+    SIC_TIER_LUT[_sic_range.start:_sic_range.stop] = _tier
+
 def sic_to_tier(sic: int) -> int:
     """map SIC to supply chain tier (the lower, the higher upstream)"""
-    for sic_range, tier in SIC_RANGES:
-        if sic in sic_range:
-            return tier
-    
-    return 2 #default to middle if unknown
+    if 0 <= sic < len(SIC_TIER_LUT):
+        return int(SIC_TIER_LUT[sic])
+    return 2
+
+class RateLimiter:
+    """thread-safe limiter spacing calls to at most `rate` per second"""
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+def make_cached_session(output_dir: Path) -> CachedSession:
+    """
+    sqlite backed session used by both scrapers
+    past the TTL entries are not refetched but revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged page only costs a 304
+    """
+    session = CachedSession(
+        output_dir / HTTP_CACHE_NAME,
+        expire_after=HTTP_CACHE_TTL,
+        stale_if_error=True, #rate limited or down, reuse what we already have
+    )
+    session.headers.update(SEC_HEADERS)
+    return session
+
+def cached_get(
+    session: CachedSession, rate_limiter: RateLimiter, url: str, timeout: float
+) -> requests.Response:
+    """GET through the http cache, only spending a rate limit slot on a miss"""
+    cached = session.cache.get_response(session.cache.create_key(requests.Request("GET", url)))
+    if cached is None or cached.is_expired:
+        rate_limiter.wait()
+    return session.get(url, timeout=timeout)
+
+def extract_category_names(html: bytes) -> list[str] | None:
+    """link texts inside <div id="mw-pages">, None if the page has no such div"""
+    start = html.find(MW_PAGES_START)
+    if start != -1:
+        ends = [i for i in (html.find(marker, start) for marker in MW_PAGES_ENDS) if i != -1]
+        if ends:
+            #regex over just that slice, no dom tree for the whole page
+            names = [
+                unescape(m.group(1).decode("utf-8")).strip()
+                for m in CATEGORY_LINK_RE.finditer(html, start, min(ends))
+            ]
+            if names:
+                return names
+            logger.warning(" mw-pages markers found but no links matched, falling back to lxml")
+
+    #markers not where we expect them or the link markup changed, fall back to a real parse
+    doc = lxml.html.fromstring(html, parser=lxml.html.HTMLParser(encoding="utf-8"))
+    mw_pages = doc.get_element_by_id("mw-pages", None)
+    if mw_pages is None:
+        return None
+    #same links the regex accepts, so labels don't depend on which path ran
+    return [text.strip() for text in mw_pages.xpath(CATEGORY_LINK_XPATH)]
+
+def save_frame(df: pd.DataFrame, out_path: Path, export_csv: bool = False) -> Path:
+    """write df as snappy parquet (keeps dtypes, e.g. zero padded ciks), csv copy is opt-in"""
+    parquet_path = out_path.with_suffix(".parquet")
+    df.to_parquet(parquet_path, compression="snappy", index=False)
+    if export_csv:
+        df.to_csv(out_path.with_suffix(".csv"), index=False)
+    return parquet_path
 
 class DisruptionLabelScraper:
     """scrapes chapter 11 bankruptcy company names from wikipedia"""
-    def __init__(self, output_dir: str = "src/data/raw"):
+    def __init__(self, output_dir: str = "src/data/raw", export_csv: bool = False):
         self.output_dir = Path(output_dir)
+        self.export_csv = export_csv
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update(SEC_HEADERS)
+        self.session = make_cached_session(self.output_dir)
+        self.rate_limiter = RateLimiter(WIKI_MAX_RPS)
+
+    def _fetch_year(self, year: int) -> list[str] | None:
+        """fetch one category page and pull out the member names, None if it failed"""
+        url = WIKI_CH11_URL.format(year=year)
+        logger.info(f"Scraping Wikipedia chapter 11 for {year} : {url}")
+
+        try:
+            resp = cached_get(self.session, self.rate_limiter, url, timeout=15) #nice delay for wikipedia
+            resp.raise_for_status()
+
+            #all category members are inside this paragraph <div id="mw-pages">
+            names = extract_category_names(resp.content)
+            if names is None:
+                logger.warning(f" No mw-pages div found for {year}")
+            return names
+
+        except requests.HTTPError as e:
+            logger.warning(f" HTTP {e.response.status_code} for {year}, skipping")
+
+        except Exception as e:
+            logger.warning(f" Failed {year}: {e}, skipping")
+
+        return None
 
     def scrape_wikipedia_bankruptcies(self, years: list[int] | None = None) -> pd.DataFrame:
         """
@@ -80,52 +225,36 @@ class DisruptionLabelScraper:
         if years is None:
             years = list(range(2018, 2026))
 
-        all_records = []
-
-        for year in years: 
-            url = WIKI_CH11_URL.format(year=year)
-            logger.info(f"Scraping Wikipedia chapter 11 for {year} : {url}")
-
-            try:
-                resp = self.session.get(url, timeout=15)
-                resp.raise_for_status()
-
-            except requests.HTTPError as e:
-                logger.warning(f" HTTP {e.response.status_code} for {year}, skipping")
-                continue
-
-            except Exception as e:
-                logger.warning(f" Failed {year}: {e}, skipping")
-                continue
-
-            soup = BeautifulSoup(resp.content, "html.parser")
-
-            #all category members are inside this paragraph <div id="mw-pages">
-            mw_pages = soup.find("div", {"id": "mw-pages"})
-            if not mw_pages:
-                logger.warning(f" No mw-pages div found for {year}")
-                continue
-
-            year_count = 0
-            
-            for link in mw_pages.find_all("a"):
-                name = link.get_text(strip=True)
-                if name:
-                    all_records.append({
-                        "name": name,
-                        "year": year,
-                        "disrupted": 1,
-                        "source": "wikipedia_ch11",
-                    })
-                    year_count += 1
-            
-            logger.info(f" {year_count} companies found for {year}")
-
-            time.sleep(1) #nice delay for wikipedia
-        
-        df = pd.DataFrame(all_records)
-        out_path = self.output_dir / "bankruptcies.csv"
-        df.to_csv(out_path, index=False)
+        names_by_year: dict[int, list[str]] = {}
+
+        #pages are independent, fetch and extract them concurrently
+        with ThreadPoolExecutor(max_workers=WIKI_MAX_WORKERS) as pool:
+            futures = {pool.submit(self._fetch_year, year): year for year in years}
+
+            for future in as_completed(futures):
+                year = futures[future]
+                names = future.result()
+                if names is None:
+                    continue
+
+                names_by_year[year] = [name for name in names if name]
+                logger.info(f" {len(names_by_year[year])} companies found for {year}")
+
+        #keep output ordered by the requested years, not completion order
+        all_names, all_years = [], []
+        for year in years:
+            year_names = names_by_year.get(year, [])
+            all_names.extend(year_names)
+            all_years.extend([year] * len(year_names))
+
+        #columns built with their final dtypes, no per-dict inference
+        df = pd.DataFrame({
+            "name":      pd.Series(all_names, dtype="str"),
+            "year":      np.array(all_years, dtype=np.int16),
+            "disrupted": np.ones(len(all_names), dtype=np.int8),
+            "source":    "wikipedia_ch11",
+        })
+        out_path = save_frame(df, self.output_dir / "bankruptcies", self.export_csv)
         logger.info(f"Saved {len(df)} total records to {out_path}")
         return df
     
@@ -134,7 +263,9 @@ class DisruptionLabelScraper:
         df = self.scrape_wikipedia_bankruptcies(years=years)
         if df.empty:
             return set()
-        return set(df["name"].str.upper().str.strip().dropna()) #giga ugly but yeah sure why not
+        #dedupe in pandas before building the set, interned so lookups can hit on identity
+        names = df["name"].dropna().str.upper().str.strip().unique()
+        return {sys.intern(name) for name in names}
     
 class SECEdgarScraper:
     """fetch company metadata from SEC EDGAR"""
@@ -142,16 +273,17 @@ class SECEdgarScraper:
     TICKERs_URL = "https://www.sec.gov/files/company_tickers.json"
     SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK{cik}.json"
 
-    def __init__(self, output_dir: str = "src/data/raw"):
+    def __init__(self, output_dir: str = "src/data/raw", export_csv: bool = False):
         self.output_dir = Path(output_dir)
+        self.export_csv = export_csv
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update(SEC_HEADERS)
+        self.session = make_cached_session(self.output_dir)
+        self.rate_limiter = RateLimiter(SEC_MAX_RPS)
 
     def fetch_all_tickers(self, max_companies: int=2500) -> pd.DataFrame:
         
         logger.info("Fetching tickers from SEC EDGAR ...")  
-        resp = self.session.get(self.TICKERs_URL, timeout=15)
+        resp = cached_get(self.session, self.rate_limiter, self.TICKERs_URL, timeout=15)
         resp.raise_for_status()
 
         records = [
@@ -160,7 +292,7 @@ class SECEdgarScraper:
                 "ticker": c["ticker"],
                 "name": c["title"],
             }
-            for i, c in list(resp.json().items())[:max_companies]
+            for i, c in list(orjson.loads(resp.content).items())[:max_companies]
         ]
 
         return pd.DataFrame(records)
@@ -170,12 +302,13 @@ class SECEdgarScraper:
         url = self.SUBMISSIONS_URL.format(cik=cik)
         
         try:
-            resp = self.session.get(url, timeout=10)
+            resp = cached_get(self.session, self.rate_limiter, url, timeout=10) #time limit required byt the SEC
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
 
             forms = data.get("filings", {}).get("recent", {}).get("form", [])
             sic = int(data.get("sic", 0) or 0)
+            form_counts = Counter(forms) #one pass over all filings
 
             return {
                 "cik":             cik,
@@ -183,10 +316,9 @@ class SECEdgarScraper:
                 "sic":             sic,
                 "sic_description": data.get("sicDescription", ""),
                 "state":           data.get("stateOfIncorporation", ""),
-                "n_10k":           forms.count("10-K"),
-                "n_8k":            forms.count("8-K"),
+                "n_10k":           form_counts["10-K"],
+                "n_8k":            form_counts["8-K"],
                 "n_total_filings": len(forms),
-                "tier":            sic_to_tier(sic),
             }
         
         except Exception as e:
@@ -195,35 +327,95 @@ class SECEdgarScraper:
         
     def build_company_dataset(self, max_companies: int=2500) -> pd.DataFrame:
         tickers = self.fetch_all_tickers(max_companies)
-        records = []
-        for i, row in tickers.iterrows():
-            meta = self.fetch_company_metadata(row["cik"])
-            if meta:
-                meta["ticker"] = row["ticker"]
-                records.append(meta)
-            time.sleep(0.12) #time limit required byt the SEC
-
-            if (i + 1) % 50 == 0:
-                logger.info(f" Processed {i+1}/{max_companies} ...")
+        results: list[dict | None] = [None] * len(tickers)
+
+        #network bound, so keep several requests in flight under the SEC rate limit
+        with ThreadPoolExecutor(max_workers=SEC_MAX_WORKERS) as pool:
+            futures = {}
+            ciks = tickers["cik"].to_numpy()
+            ticker_symbols = tickers["ticker"].to_numpy()
+            for i, (cik, ticker) in enumerate(zip(ciks, ticker_symbols)):
+                future = pool.submit(self.fetch_company_metadata, cik)
+                futures[future] = (i, ticker)
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                i, ticker = futures[future]
+                meta = future.result()
+                if meta:
+                    meta["ticker"] = ticker
+                    results[i] = meta
+
+                if done % 50 == 0:
+                    logger.info(f" Processed {done}/{len(tickers)} ...")
+
+        records = [meta for meta in results if meta is not None]
         
-        df = pd.DataFrame(records)
-        df.to_csv(self.output_dir/"companies.csv", index=False)
-        logger.info(f"Saved{len(df)} companies to src/data/raw/companies.csv")
+        df = pd.DataFrame.from_records(records, columns=list(COMPANY_DTYPES)).astype(COMPANY_DTYPES)
+
+        #whole column in one lookup instead of sic_to_tier per company
+        sic = df["sic"].clip(0, len(SIC_TIER_LUT) - 1).to_numpy()
+        df.insert(df.columns.get_loc("n_total_filings") + 1, "tier", SIC_TIER_LUT[sic])
+        out_path = save_frame(df, self.output_dir / "companies", self.export_csv)
+        logger.info(f"Saved {len(df)} companies to {out_path}")
 
         return df
     
+def _build_automaton(words: set[str]) -> ahocorasick.Automaton:
+    """aho-corasick automaton matching every word in one pass over a text"""
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        if word:
+            automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+def _matches_any(automaton: ahocorasick.Automaton, text: str) -> bool:
+    if automaton.kind != ahocorasick.AHOCORASICK: #no words were added
+        return False
+    return next(automaton.iter(text), None) is not None
+
 def label_companies( companies: pd.DataFrame, disrupted_names: set[str],)-> pd.DataFrame:
     """
     add binary disrupted column to the companies df 
     match on uppercase name using substring containment
     """
-    def is_disrupted(name:str)->int:
-        name_up  = name.upper().strip()
-        return int(any(d in name_up or name_up in d for d in disrupted_names))
+    #normalise the whole column in pandas' string kernels, not per row
+    norm = companies["name"].str.upper().str.strip()
+
+    #exact hits are cheap hashed lookups, only the rest needs containment
+    exact = norm.isin(disrupted_names)
+    rest = norm[~exact]
+
+    # d in name_up: scan each company name once against all disrupted names
+    disrupted_ac = _build_automaton(disrupted_names)
+    match_all = "" in disrupted_names
+
+    # name_up in d: scan each disrupted name once against all company names
+    # a name can only sit inside a d at least as long, so drop the rest up front
+    longest = max(map(len, disrupted_names), default=0)
+    candidates = {name_up for name_up in set(rest) if len(name_up) <= longest}
+    shortest = min(map(len, candidates), default=0)
+
+    company_ac = _build_automaton(candidates)
+    # "" is in every d but the automaton can't hold an empty word, so seed it by hand
+    contained = {""} if disrupted_names else set()
+    if company_ac.kind == ahocorasick.AHOCORASICK:
+        for d in disrupted_names:
+            if len(d) >= shortest:
+                contained.update(word for _, word in company_ac.iter(d))
+
+    def is_disrupted(name_up:str)->bool:
+        return match_all or name_up in contained or _matches_any(disrupted_ac, name_up)
     
-    companies = companies.copy()
-    companies["disrupted"] = companies["name"].apply(is_disrupted)
-    pos = companies["disrupted"].sum()
+    #fill a plain array and attach it once, no full copy of the input frame
+    exact_mask = exact.to_numpy()
+    disrupted = exact_mask.astype(np.int8)
+    disrupted[~exact_mask] = np.fromiter(
+        (is_disrupted(name_up) for name_up in rest.to_numpy()), dtype=np.int8, count=len(rest),
+    )
+
+    companies = companies.assign(disrupted=disrupted)
+    pos = int(disrupted.sum())
     logger.info(
         f"Labelled {len(companies)} companies: "
         f" {pos} disrupted ({100 * pos / len(companies):.1f}%)"
@@ -236,20 +428,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--max-companies", type=int, default=5000)
     parser.add_argument("--years", type=int, nargs="+", default=list(range(1995, 2026)))
+    parser.add_argument("--csv", action="store_true", help="also export csv next to the parquet files")
 
     args = parser.parse_args()
 
     #SEC EDGAR
-    sec = SECEdgarScraper()
+    sec = SECEdgarScraper(export_csv=args.csv)
     companies = sec.build_company_dataset(args.max_companies)
 
     #wikipedia chapter 11 labels
-    label_scraper = DisruptionLabelScraper()
+    label_scraper = DisruptionLabelScraper(export_csv=args.csv)
     disrupted_names = label_scraper.builld_disrupted_name_set(args.years)
 
     #label companies
     companies = label_companies(companies, disrupted_names)
-    companies.to_csv("src/data/raw/companies_labelled.csv", index=False)
+    save_frame(companies, sec.output_dir / "companies_labelled", args.csv)
 
     print("\nTier distribution:")
     print(companies["tier"].value_counts().sort_index())
@@ -0,0 +1,82 @@
+import random
+from pathlib import Path
+
+import pandas as pd
+
+from scraper.scraper import MW_PAGES_ENDS, extract_category_names, label_companies
+
+
+def naive_labels(names: list[str], disrupted_names: set[str]) -> list[int]:
+    """the original pairwise containment check label_companies has to agree with"""
+    labels = []
+    for name in names:
+        name_up = name.upper().strip()
+        labels.append(int(any(d in name_up or name_up in d for d in disrupted_names)))
+    return labels
+
+def run_labels(names: list[str], disrupted_names: set[str]) -> list[int]:
+    labelled = label_companies(pd.DataFrame({"name": names}), disrupted_names)
+    return labelled["disrupted"].tolist()
+
+def test_label_companies_matches_naive_predicate():
+    rng = random.Random(0)
+    for _ in range(300):
+        # tiny alphabets so containment in both directions actually happens
+        disrupted_names = {
+            "".join(rng.choices("AB", k=rng.randint(0, 4)))
+            for _ in range(rng.randint(0, 6))
+        }
+        names = [
+            "".join(rng.choices("abAB ", k=rng.randint(0, 7)))
+            for _ in range(rng.randint(1, 12))
+        ]
+        assert run_labels(names, disrupted_names) == naive_labels(names, disrupted_names)
+
+def test_label_companies_empty_name():
+    assert run_labels(["", "  "], {"ACME"}) == [1, 1]
+    assert run_labels(["", "  "], set()) == [0, 0]
+
+def test_label_companies_empty_disrupted_set():
+    assert run_labels(["Acme", "Beta Corp"], set()) == [0, 0]
+
+def test_label_companies_empty_disrupted_name_matches_everything():
+    assert run_labels(["Acme", ""], {""}) == [1, 1]
+
+def test_label_companies_does_not_mutate_input():
+    companies = pd.DataFrame({"name": ["Acme Corp"]})
+    label_companies(companies, {"ACME"})
+    assert list(companies.columns) == ["name"]
+
+CATEGORY_PAGE = (Path(__file__).parent / "data" / "wiki_ch11_category.html").read_bytes()
+
+CATEGORY_NAMES = [
+    "Aceto Corporation",
+    "Achaogen",
+    "Alta Mesa Resources",
+    "Barneys New York",
+    "Bumble Bee Foods",
+    "Forever 21",
+    "Fusion Connect",
+    "Pacific Gas & Electric Company",
+    "Purdue Pharma",
+    "Sears Holdings",
+    "Sungard Availability Services",
+]
+
+def test_extract_category_names_regex_path():
+    assert extract_category_names(CATEGORY_PAGE) == CATEGORY_NAMES
+
+def test_extract_category_names_lxml_fallback_matches_regex_path():
+    # without the end markers the regex path bails out to the lxml parse
+    page = CATEGORY_PAGE
+    for marker in MW_PAGES_ENDS:
+        page = page.replace(marker, b"")
+    assert extract_category_names(page) == CATEGORY_NAMES
+
+def test_extract_category_names_without_mw_pages():
+    assert extract_category_names(b"<html><body><p>nothing here</p></body></html>") is None
+
+def test_extract_category_names_falls_back_when_regex_finds_nothing():
+    # markers still present, but an attribute ahead of href no longer fits the regex
+    page = CATEGORY_PAGE.replace(b'<li><a href="', b'<li><a data-x="1" href="')
+    assert extract_category_names(page) == CATEGORY_NAMES